@@ -1,6 +1,8 @@
+import os
 import pandas as pd
 import numpy as np
 import streamlit as st
+from tracing import span
 
 # ✅ Updated multiselect function with default support
 def multiselect(title, options_list, default=None):
@@ -29,3 +31,154 @@ def multiselect(title, options_list, default=None):
 """
 Extra helper functions (if needed later) can be added below.
 """
+
+def apply_filters(data, filters):
+    """
+    Keep the rows whose value is in the selected list for every column.
+    filters: {column: selected values}, as returned by the sidebar multiselects.
+    """
+    mask = pd.Series(True, index=data.index)
+    for col, selected in filters.items():
+        with span(f"filter:{col}"):
+            mask &= data[col].isin(selected)
+    with span("filter:select rows"):
+        return data[mask]
+
+
+def dataset_version(path):
+    """Identifies one version of a data file, so caches built from it are dropped when the file changes."""
+    stat = os.stat(path)
+    return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+@st.cache_data(show_spinner=False)
+def filter_options(version, _data, col):
+    """Distinct values of a filter column, computed once per dataset version instead of on every rerun."""
+    return _data[col].unique().tolist()
+
+
+class AccountIndex:
+    """
+    Sorted index over one account ID column.
+    keys holds the distinct IDs in ascending order; the rows of keys[i] are rows[offsets[i]:offsets[i + 1]].
+    Looking accounts up is a binary search plus a slice, so it never scans the table.
+    """
+
+    def __init__(self, ids):
+        ids = np.asarray(ids)
+        self.rows = np.argsort(ids, kind="stable")
+        self.keys, starts = np.unique(ids[self.rows], return_index=True)
+        self.offsets = np.append(starts, len(ids))
+        # Key positions from most to least active, so busiest() is a slice on every rerun
+        self._by_activity = np.argsort(-self.counts(), kind="stable")
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def count_of(self, account_ids):
+        """Number of rows for each of the given accounts (0 for unknown IDs)."""
+        account_ids = np.asarray(account_ids)
+        counts = np.zeros(len(account_ids), dtype=np.int64)
+        at = np.searchsorted(self.keys, account_ids)
+        known = at < len(self.keys)
+        known[known] = self.keys[at[known]] == account_ids[known]
+        counts[known] = self.offsets[at[known] + 1] - self.offsets[at[known]]
+        return counts
+
+    def busiest(self, limit):
+        """The accounts with the most transactions."""
+        return self.keys[self._by_activity[:limit]]
+
+    def range(self, low, high, limit=None):
+        """IDs between low and high inclusive."""
+        start = np.searchsorted(self.keys, low, side="left")
+        stop = np.searchsorted(self.keys, high, side="right")
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return self.keys[start:stop]
+
+    def prefix(self, prefix, limit=None):
+        """IDs whose decimal form starts with prefix, e.g. "301" matches 301, 3010-3019, 30100-30199..."""
+        # IDs are integers, so no decimal form starts with a leading zero (except 0 itself)
+        if not prefix.isdigit() or len(self.keys) == 0 or (len(prefix) > 1 and prefix[0] == "0"):
+            return self.keys[:0]
+        first = int(prefix)
+        matches, found = [], 0
+        # Every extra digit widens the matching block of IDs by a factor of ten
+        for extra_digits in range(len(str(self.keys[-1])) - len(prefix) + 1):
+            scale = 10 ** extra_digits
+            block = self.range(first * scale, (first + 1) * scale - 1,
+                               None if limit is None else limit - found)
+            matches.append(block)
+            found += len(block)
+            if first == 0 or (limit is not None and found >= limit):
+                break
+        return np.concatenate(matches) if matches else self.keys[:0]
+
+    def row_positions(self, account_ids):
+        """Positions (for DataFrame.take) of every row belonging to the given accounts."""
+        account_ids = np.asarray(account_ids)
+        at = np.searchsorted(self.keys, account_ids)
+        at = at[(at < len(self.keys)) & (self.keys[np.minimum(at, len(self.keys) - 1)] == account_ids)]
+        if len(at) == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in at])
+
+
+@st.cache_resource(show_spinner=False)
+def account_index(version, _data, col):
+    """AccountIndex for one ID column, built once per dataset version and shared by all sessions."""
+    return AccountIndex(_data[col].to_numpy())
+
+
+ACCOUNT_COLUMNS = {
+    "Source or destination": ["sourceid", "destinationid"],
+    "Source ID": ["sourceid"],
+    "Destination ID": ["destinationid"],
+}
+
+
+def _search_accounts(indexes, query, limit):
+    query = query.strip()
+    if not query:
+        # Rank the candidates by their rows across all searched columns, then show them in ID order
+        candidates = np.unique(np.concatenate([index.busiest(limit) for index in indexes]))
+        totals = sum(index.count_of(candidates) for index in indexes)
+        top = candidates[np.argsort(-totals, kind="stable")[:limit]]
+        return sorted(top.tolist())
+    if "-" in query:
+        low, _, high = query.partition("-")
+        if not (low.strip().isdigit() and high.strip().isdigit()):
+            return []
+        found = [index.range(int(low), int(high), limit) for index in indexes]
+    else:
+        found = [index.prefix(query, limit) for index in indexes]
+    return sorted(set(np.concatenate(found).tolist()))[:limit]
+
+
+def account_filter(data, version, limit=200):
+    """
+    Searchable account filter for the sidebar.
+    The multiselect only ever lists the accounts matching the search (a prefix or a low-high range; with an
+    empty search, the busiest accounts), so it stays small however many IDs the data has.
+    Returns the row positions of the selected accounts, or None when no account is selected.
+    """
+    match_on = st.sidebar.selectbox("Match on", list(ACCOUNT_COLUMNS), key="account_match_on")
+    indexes = [account_index(version, data, col) for col in ACCOUNT_COLUMNS[match_on]]
+
+    query = st.sidebar.text_input("Search account ID", key="account_query",
+                                  placeholder="Prefix (301) or range (30000-30500)")
+    with span("filter:account search"):
+        matches = _search_accounts(indexes, query, limit)
+
+    # Keep accounts picked under an earlier search selectable
+    selected = st.session_state.get("account_ids", [])
+    options = sorted(set(matches) | set(selected))
+    selected = st.sidebar.multiselect(f"Select accounts ({len(matches)} shown)", options, key="account_ids")
+    if not selected:
+        return None
+
+    with span("filter:account rows"):
+        positions = [index.row_positions(selected) for index in indexes]
+        return np.unique(np.concatenate(positions))
+
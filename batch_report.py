@@ -0,0 +1,202 @@
+"""
+Headless batch export of the dashboard charts, one report per (month x typeofcrime) slice.
+
+Runs without a Streamlit server: it reuses the aggregate and draw steps from charts.CHARTS. The data is split
+into slices in one groupby pass and the Key Metrics of every slice come from a single grouped aggregation.
+Each slice's chart aggregates are computed in this process; drawing and PNG encoding, the slow part, are
+fanned out over a process pool.
+
+Every slice gets its own folder with one PNG and one CSV per chart, a metrics.csv and a report.html. Finished
+slices are recorded in <out>/progress.json as they complete, so an interrupted run picks up where it stopped.
+
+Usage:
+    python batch_report.py --data newdataset.csv --out reports
+    python batch_report.py --workers 8 --formats png csv
+    python batch_report.py --fresh          # ignore progress.json and redo every slice
+"""
+import argparse
+import base64
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from charts import CHARTS, figure_to_png
+
+SLICE_COLUMNS = ['month', 'typeofcrime']
+FORMATS = ['png', 'html', 'csv']
+PROGRESS_FILE = 'progress.json'
+
+
+def slice_name(month, crime):
+    return f'month-{int(month):02d}_{crime}'
+
+
+def key_metrics(data):
+    """The dashboard's Key Metrics for every slice, from one grouped aggregation."""
+    grouped = data.groupby(SLICE_COLUMNS)
+    metrics = grouped.agg(total_transactions=('amountofmoney', 'size'),
+                          fraudulent_cases=('isfraud', 'sum'),
+                          total_amount=('amountofmoney', 'sum'),
+                          avg_transaction=('amountofmoney', 'mean'))
+    metrics['fraud_percentage'] = metrics['fraudulent_cases'] / metrics['total_transactions'] * 100
+    return metrics
+
+
+def _metrics_row(metrics, key):
+    """One slice's metrics as plain Python values, keeping counts as ints (a .loc row would upcast them)."""
+    return {col: metrics[col].loc[key].item() for col in metrics.columns}
+
+
+def _table(result):
+    """CSV-friendly form of a chart aggregate. The histogram's input is summarised as its 30 bins."""
+    if isinstance(result, pd.Series):
+        counts, edges = np.histogram(result, bins=30)
+        return pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': counts})
+    return result.reset_index() if isinstance(result, pd.DataFrame) and result.index.name else result
+
+
+def _figures(name, figures):
+    """(file stem, figure) pairs for whatever a draw step returned."""
+    if not isinstance(figures, tuple):
+        return [(name, figures)]
+    suffixes = ['bar', 'pie'] if name == 'fraud_analysis' else [str(i) for i in range(len(figures))]
+    return [(f'{name}_{suffix}', fig) for suffix, fig in zip(suffixes, figures) if fig is not None]
+
+
+def _html_report(title, metrics, images):
+    rows = ''.join(f'<tr><th>{html.escape(k)}</th><td>{v:,}</td></tr>' if isinstance(v, int)
+                   else f'<tr><th>{html.escape(k)}</th><td>{v:,.2f}</td></tr>' for k, v in metrics.items())
+    charts = ''.join(f'<h2>{html.escape(stem)}</h2><img src="data:image/png;base64,{base64.b64encode(png).decode()}">'
+                     for stem, png in images)
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>body{{font-family:sans-serif;margin:2rem}}img{{max-width:100%}}td,th{{padding:.25rem 1rem;text-align:left}}</style>'
+            f'</head><body><h1>{html.escape(title)}</h1><table>{rows}</table>{charts}</body></html>')
+
+
+def render_slice(name, out_dir, aggregates, metrics, formats):
+    """
+    Worker: draw every chart of one slice and write its outputs.
+    aggregates maps chart name -> aggregate result. Charts are only drawn when a png or html output asks for
+    them. Returns (slice name, charts rendered, seconds).
+    """
+    start = time.perf_counter()
+    slice_dir = os.path.join(out_dir, name)
+    os.makedirs(slice_dir, exist_ok=True)
+
+    draw_charts = bool({'png', 'html'} & set(formats))
+    images = []
+    for chart, result in aggregates.items():
+        if 'csv' in formats:
+            _table(result).to_csv(os.path.join(slice_dir, f'{chart}.csv'), index=False)
+        if not draw_charts:
+            continue
+        _, draw = CHARTS[chart]
+        for stem, fig in _figures(chart, draw(result)):
+            png = figure_to_png(fig)
+            images.append((stem, png))
+            if 'png' in formats:
+                with open(os.path.join(slice_dir, f'{stem}.png'), 'wb') as f:
+                    f.write(png)
+
+    pd.DataFrame([metrics]).to_csv(os.path.join(slice_dir, 'metrics.csv'), index=False)
+    if 'html' in formats:
+        with open(os.path.join(slice_dir, 'report.html'), 'w', encoding='utf-8') as f:
+            f.write(_html_report(name, metrics, images))
+    return name, len(images), time.perf_counter() - start
+
+
+def _load_progress(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f)['done'])
+
+
+def _save_progress(path, done):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'done': sorted(done)}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run(data_path, out_dir, workers=None, formats=FORMATS, fresh=False):
+    """Export every pending slice and return the run summary."""
+    wall_start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    progress_path = os.path.join(out_dir, PROGRESS_FILE)
+    done = set() if fresh else _load_progress(progress_path)
+
+    data = pd.read_csv(data_path)
+    metrics = key_metrics(data)
+    pending = {slice_name(month, crime): (month, crime) for month, crime in metrics.index}
+    skipped = len(pending.keys() & done)
+    pending = {name: key for name, key in pending.items() if name not in done}
+    print(f'{len(pending)} slices to export, {skipped} already done', file=sys.stderr)
+
+    charts_rendered = 0
+    failures = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        # One pass over the data splits it into every slice
+        for key, slice_df in data.groupby(SLICE_COLUMNS):
+            name = slice_name(*key)
+            if name not in pending:
+                continue
+            aggregates = {chart: aggregate(slice_df) for chart, (aggregate, _) in CHARTS.items()}
+            future = pool.submit(render_slice, name, out_dir, aggregates, _metrics_row(metrics, key), formats)
+            futures[future] = name
+
+        for future in as_completed(futures):
+            # One broken slice must not stop the others from being recorded as done
+            try:
+                name, n_charts, seconds = future.result()
+            except Exception as e:
+                failures[futures[future]] = f'{type(e).__name__}: {e}'
+                print(f'{futures[future]} FAILED: {failures[futures[future]]}', file=sys.stderr)
+                continue
+            charts_rendered += n_charts
+            done.add(name)
+            _save_progress(progress_path, done)
+            print(f'[{len(done) - skipped + len(failures)}/{len(pending)}] {name}: {n_charts} charts in {seconds:.2f}s', file=sys.stderr)
+
+    wall_time = time.perf_counter() - wall_start
+    summary = {
+        'slices_exported': len(futures) - len(failures),
+        'slices_skipped': skipped,
+        'slices_failed': len(failures),
+        'failures': failures,
+        'charts_rendered': charts_rendered,
+        'wall_time_seconds': wall_time,
+        'charts_per_second': charts_rendered / wall_time if wall_time else 0.0,
+    }
+    with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='newdataset.csv', help='transactions CSV with month and typeofcrime columns')
+    parser.add_argument('--out', default='reports', help='output folder (default reports/)')
+    parser.add_argument('--workers', type=int, help='render processes (default: one per CPU)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--fresh', action='store_true', help='ignore progress.json and export every slice again')
+    args = parser.parse_args(argv)
+
+    summary = run(args.data, args.out, args.workers, args.formats, args.fresh)
+    print(f"\n{summary['slices_exported']} slices, {summary['charts_rendered']} charts in "
+          f"{summary['wall_time_seconds']:.1f}s ({summary['charts_per_second']:.1f} charts/s)", file=sys.stderr)
+    if summary['slices_failed']:
+        print(f"{summary['slices_failed']} slices failed, rerun to retry them", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Stage-by-stage benchmark of the dashboard pipeline, without a Streamlit server.
+
+For every table size this times: parsing the CSV, applying the sidebar filters, building the account index
+and pulling a few accounts' rows through it, and for each chart in charts.CHARTS its aggregate step and its
+render step (drawing the Figure and encoding it to PNG, which is what st.pyplot does).
+
+Two memory figures are recorded per stage:
+    rss_peak_mb, rss_growth_mb  peak resident set size of the process during the first timed run, and how far it
+                                rose above the RSS at the start of the stage. This is real process memory, numpy
+                                buffers and matplotlib's C++ renderer included. Linux only: the peak is reset per
+                                stage through /proc/self/clear_refs; None elsewhere.
+    python_heap_peak_mb         peak of the allocations tracemalloc sees in one extra run, which is what Python
+                                and the libraries routing through its allocator (numpy, pandas) hold. Memory C
+                                extensions allocate on their own is not in it.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --sizes 10k 1m
+    python -m benchmarks.run_benchmarks --sizes 10k 1m --compare benchmarks/results/<old commit>.json
+
+Results are written as JSON (one record per size and stage) so runs from different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import alphapreprocess
+from charts import CHARTS, figure_to_png
+from benchmarks.synthetic_data import SIZES, cached_csv
+
+FILTER_COLUMNS = ['month', 'typeofaction', 'isfraud', 'typeofcrime']
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=HERE).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _render(figures):
+    if not isinstance(figures, tuple):
+        figures = (figures,)
+    return [figure_to_png(fig) for fig in figures if fig is not None]
+
+
+def _stages(csv_path):
+    """
+    Yield (stage name, callable) in pipeline order.
+    Each callable runs one stage on the output of the previous ones, so later stages see real inputs.
+    """
+    state = {}
+
+    def parse():
+        state['data'] = pd.read_csv(csv_path)
+    yield 'parse', parse
+
+    def filter_rows():
+        data = state['data']
+        # Same selection the dashboard starts with: "Select all" for every filter
+        filters = state.setdefault('filters', {col: data[col].unique() for col in FILTER_COLUMNS})
+        state['filtered'] = alphapreprocess.apply_filters(data, filters)
+    yield 'filter', filter_rows
+
+    def build_account_index():
+        state['account_index'] = alphapreprocess.AccountIndex(state['data']['sourceid'].to_numpy())
+    yield 'account_index:build', build_account_index
+
+    def account_lookup():
+        # A handful of accounts, as in a typical investigation; the busiest ones are the worst case
+        index = state['account_index']
+        state['data'].take(index.row_positions(index.busiest(5)))
+    yield 'account_lookup', account_lookup
+
+    for name, (aggregate, draw) in CHARTS.items():
+        def aggregate_stage(name=name, aggregate=aggregate):
+            state[name] = aggregate(state['filtered'])
+        yield f'aggregate:{name}', aggregate_stage
+
+        def render_stage(name=name, draw=draw):
+            _render(draw(state[name]))
+        yield f'render:{name}', render_stage
+
+
+def _rss_status():
+    """(current RSS, peak RSS) of this process in bytes from /proc/self/status, or None where that is missing."""
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return int(fields['VmRSS'].split()[0]) * 1024, int(fields['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS mark (VmHWM) to the current RSS; False where that is not supported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _measure(fn, repeat):
+    """Return (timings, RSS before the first run, peak RSS during it, peak traced Python heap); RSS may be None."""
+    rss_before = rss_peak = None
+    timings = []
+    for i in range(repeat):
+        if i == 0 and _reset_peak_rss():
+            rss_before = _rss_status()[0]
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        if i == 0 and rss_before is not None:
+            rss_peak = _rss_status()[1]
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, heap_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, rss_before, rss_peak, heap_peak
+
+
+def _mb(n_bytes):
+    return None if n_bytes is None else n_bytes / 2**20
+
+
+def run(size_names, repeat, data_dir, seed):
+    records = []
+    for size_name in size_names:
+        n_rows = SIZES[size_name]
+        print(f'== {size_name} ({n_rows:,} rows)', file=sys.stderr)
+        csv_path = cached_csv(data_dir, n_rows, seed)
+        for stage, fn in _stages(csv_path):
+            timings, rss_before, rss_peak, heap_peak = _measure(fn, repeat)
+            record = {
+                'size': size_name,
+                'rows': n_rows,
+                'stage': stage,
+                'seconds_min': min(timings),
+                'seconds_median': statistics.median(timings),
+                'rss_peak_mb': _mb(rss_peak),
+                'rss_growth_mb': _mb(rss_peak - rss_before) if rss_peak is not None else None,
+                'python_heap_peak_mb': _mb(heap_peak),
+            }
+            records.append(record)
+            rss = f'{record["rss_growth_mb"]:>10.1f} MB rss' if rss_peak is not None else f'{"n/a":>13} rss'
+            print(f'{stage:<50} {record["seconds_median"]:>10.4f}s  {rss}  {record["python_heap_peak_mb"]:>10.1f} MB heap',
+                  file=sys.stderr)
+    return records
+
+
+def compare(records, baseline_path, threshold):
+    """Print the median-time ratio against a previous results file; return the regressed stages."""
+    with open(baseline_path) as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f'\nvs {baseline_path}', file=sys.stderr)
+    for record in records:
+        old = baseline.get((record['size'], record['stage']))
+        if old is None or old['seconds_median'] == 0:
+            continue
+        ratio = record['seconds_median'] / old['seconds_median']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(record)
+        print(f'{record["size"]:>4} {record["stage"]:<50} x{ratio:.2f}{flag}', file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['10k', '1m'])
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (default 3)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(HERE, 'data'),
+                        help='where generated CSVs are cached between runs')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='RESULTS', help='previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown ratio above which a stage counts as a regression (default 0.10)')
+    args = parser.parse_args(argv)
+
+    commit = _git_commit()
+    records = run(args.sizes, args.repeat, args.data_dir, args.seed)
+
+    output = args.output or os.path.join(HERE, 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'results': records,
+        }, f, indent=2)
+    print(f'\nwrote {output}', file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(records, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Synthetic transaction tables with the newdataset.csv schema.
+
+Account IDs are Zipf-distributed (a handful of accounts move most of the money) and amounts are a
+two-mode log-normal mix, which is close to what the real data looks like. Generation is vectorised
+and done in chunks, so the 50M row table never has to sit in memory at once.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['typeofaction', 'sourceid', 'destinationid', 'amountofmoney', 'date',
+           'isfraud', 'typeoffraud', 'levelofcrime', 'typeofcrime', 'month']
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000, '50m': 50_000_000}
+
+N_ACCOUNTS = 100_000
+CHUNK_ROWS = 1_000_000
+FIRST_DAY = np.datetime64('2019-02-20')
+N_DAYS = 151  # up to 2019-07-20, like newdataset.csv
+
+
+def _account_ids(rng, n):
+    # Zipf ranks mapped onto a shuffled ID space so the hot accounts are not simply 1, 2, 3...
+    # With a=1.1 the top 1% of accounts take about half of the rows.
+    ranks = (rng.zipf(1.1, n) - 1) % N_ACCOUNTS
+    return _ACCOUNT_PERMUTATION[ranks]
+
+
+_ACCOUNT_PERMUTATION = np.random.default_rng(0).permutation(N_ACCOUNTS) + 1
+
+
+def generate_chunk(n, rng):
+    """Build one DataFrame of n synthetic transactions."""
+    is_fraud = (rng.random(n) < 0.93).astype(np.int64)
+    fraud_type = rng.integers(1, 4, n)
+    # typeofcrime follows the fraud type most of the time, as in the real data
+    crime_type = np.where(rng.random(n) < 0.97, fraud_type, rng.integers(1, 4, n))
+
+    large = rng.random(n) < 0.3
+    amounts = np.where(large, rng.lognormal(15.4, 0.25, n), rng.lognormal(12.9, 0.35, n)).astype(np.int64)
+
+    dates = FIRST_DAY + rng.integers(0, N_DAYS, n).astype('timedelta64[D]')
+    date_index = pd.DatetimeIndex(dates)
+
+    type_names = np.array(['none', 'type1', 'type2', 'type3'])
+    return pd.DataFrame({
+        'typeofaction': np.where(rng.random(n) < 0.7, 'transfer', 'cash-in'),
+        'sourceid': _account_ids(rng, n),
+        'destinationid': _account_ids(rng, n),
+        'amountofmoney': amounts,
+        'date': date_index.strftime('%Y-%m-%d'),
+        'isfraud': is_fraud,
+        'typeoffraud': type_names[np.where(is_fraud == 1, fraud_type, 0)],
+        'levelofcrime': np.where(rng.random(n) < 0.65, 'colleague', 'head'),
+        'typeofcrime': type_names[crime_type],
+        'month': date_index.month.astype(np.int64),
+    }, columns=COLUMNS)
+
+
+def generate(n_rows, seed=42):
+    """Return an in-memory table of n_rows transactions."""
+    rng = np.random.default_rng(seed)
+    chunks = [generate_chunk(min(CHUNK_ROWS, n_rows - start), rng) for start in range(0, n_rows, CHUNK_ROWS)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_csv(path, n_rows, seed=42):
+    """Stream n_rows transactions to a CSV file, one chunk at a time."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.part'
+    with open(tmp_path, 'w', newline='') as f:
+        for start in range(0, n_rows, CHUNK_ROWS):
+            chunk = generate_chunk(min(CHUNK_ROWS, n_rows - start), rng)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    os.replace(tmp_path, path)
+    return path
+
+
+def cached_csv(data_dir, n_rows, seed=42):
+    """Path to a generated CSV of n_rows, creating it on first use."""
+    path = os.path.join(data_dir, f'transactions_{n_rows}_{seed}.csv')
+    if not os.path.exists(path):
+        write_csv(path, n_rows, seed)
+    return path
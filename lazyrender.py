@@ -0,0 +1,107 @@
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+
+import tracing
+from charts import figure_to_png
+
+# How often a section with a pending background render checks whether its chart is ready
+POLL_SECONDS = 0.5
+
+
+@st.cache_resource
+def _background_pool():
+    """One small thread pool per server process, shared by every session."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="chart-render")
+
+
+def frame_signature(filtered_df, version=""):
+    """
+    Cheap fingerprint of the rows that survived the filters in one version of the dataset.
+    Used to tell whether a background render still matches the current filters and data file;
+    the row labels alone would not change when the file is replaced by one of the same length.
+    """
+    hashed = pd.util.hash_pandas_object(filtered_df.index, index=False).values
+    digest = hashlib.md5(str(version).encode())
+    digest.update(hashed.tobytes())
+    return digest.hexdigest()
+
+
+def _render_png(key, build, filtered_df):
+    figure = build(filtered_df)
+    with tracing.span(f"png:{key}"):
+        return figure_to_png(figure)
+
+
+def _background_job(key, build, filtered_df, signature):
+    """Return the render future for this section, (re)submitting it when the filters changed."""
+    jobs = st.session_state.setdefault("_lazy_jobs", {})
+    job = jobs.get(key)
+    if job is None or job[0] != signature:
+        if job is not None:
+            job[1].cancel()
+        # The copied context carries this run's tracer over to the worker thread
+        future = _background_pool().submit(contextvars.copy_context().run, tracing.run_job,
+                                           f"background:{key}", _render_png, key, build, filtered_df)
+        job = jobs[key] = (signature, future)
+    return job[1]
+
+
+@st.fragment
+def _section(key, plot_fn, filtered_df):
+    if st.toggle("Render chart", key=f"lazy_{key}"):
+        plot_fn(filtered_df)
+
+
+def _show_render(key, plot_fn, filtered_df, future):
+    if future.exception() is not None:
+        st.error(f"⚠️ This chart could not be rendered: {future.exception()}")
+        return
+    png, trace = future.result()
+    tracing.record_job(f"background:{key}", trace)
+    plot_fn(filtered_df, png=png)
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _await_render(key, plot_fn, filtered_df, future):
+    """
+    Placeholder for a pending background render that turns into the chart once it is ready.
+    Each tick reruns only this fragment, never the page. Streamlit drops the timer at the next page run or
+    when the section reruns without it; until then a tick after the render finished resends the same PNG.
+    """
+    if future.done():
+        _show_render(key, plot_fn, filtered_df, future)
+    else:
+        st.info("⏳ Rendering in the background, the chart will appear here when it is ready.")
+
+
+@st.fragment
+def _background_section(key, plot_fn, build, filtered_df, signature):
+    if not st.toggle("Render chart", key=f"lazy_{key}"):
+        return
+    future = _background_job(key, build, filtered_df, signature)
+    # Only poll while the render is pending; a finished section is static until something changes
+    if future.done():
+        _show_render(key, plot_fn, filtered_df, future)
+    else:
+        _await_render(key, plot_fn, filtered_df, future)
+
+
+def lazy_section(key, title, plot_fn, filtered_df, build=None, version=""):
+    """
+    Render one chart section on demand.
+    The section sits in a collapsed expander and only computes once its "Render chart" toggle is on;
+    flipping the toggle reruns just that section. A filter change reruns the page, but sections that
+    are switched off cost nothing.
+    If build is given (filtered_df -> matplotlib Figure), the aggregate and draw steps run in a
+    background thread and the section shows the chart when it is ready instead of blocking the page.
+    version identifies the loaded dataset (see alphapreprocess.dataset_version) so a replaced file
+    starts a new render.
+    """
+    with st.expander(title, expanded=False):
+        if build is None:
+            _section(key, plot_fn, filtered_df)
+        else:
+            _background_section(key, plot_fn, build, filtered_df, frame_signature(filtered_df, version))
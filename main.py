@@ -1,7 +1,8 @@
 # main.py
 import streamlit as st
 import pandas as pd
-import preprocess
+import alphapreprocess as preprocess
+import tracing
 
 from charts import (
    plot_daily_transactions,
@@ -9,13 +10,22 @@ from charts import (
    plot_distribution_of_transaction_amounts,
    plot_fraud_type_analysis,
    plot_heatmap,
-   plot_crime_level_trends
+   plot_crime_level_trends,
+   build_figure
 )
+from lazyrender import lazy_section
 
 # ---------------------------------------------------------DATA LOADING AND PAGE CONFIGURATIONS------------------------------------------------------------
 
+# Start this run's trace; the toggles live in the "Performance" sidebar panel further down
+tracer = tracing.start(st.session_state.get("perf_tracing", False), st.session_state.get("perf_memory", False))
+
 # Load your data
-data = pd.read_csv("dataset1.csv")
+DATA_PATH = "newdataset.csv"
+with tracing.span("load:data"):
+    data = pd.read_csv(DATA_PATH)
+# Filter options and the account index are cached per version of the data file
+data_version = preprocess.dataset_version(DATA_PATH)
 
 # Set up your Streamlit page configuration
 st.set_page_config(
@@ -251,27 +261,32 @@ st.sidebar.markdown("---")
 # Check if 'month' column exists before accessing it
 if 'month' in data.columns:
     st.sidebar.markdown("### 📅 Time Period")
-    selected_month = preprocess.multiselect("Select Month", sorted(data["month"].unique()))
+    selected_month = preprocess.multiselect("Select Month", sorted(preprocess.filter_options(data_version, data, "month")))
 else:
     st.error("⚠️ The 'month' column is not available in the data.")
     selected_month = []
 
 st.sidebar.markdown("### 💼 Transaction Type")
-selected_action = preprocess.multiselect("Select Type of Action", data["typeofaction"].unique())
+selected_action = preprocess.multiselect("Select Type of Action", preprocess.filter_options(data_version, data, "typeofaction"))
 
 st.sidebar.markdown("### 🚨 Fraud Status")
-selected_isfraud = preprocess.multiselect("Select Fraud Status", data["isfraud"].unique())
+selected_isfraud = preprocess.multiselect("Select Fraud Status", preprocess.filter_options(data_version, data, "isfraud"))
 
 st.sidebar.markdown("### 🔴 Crime Classification")
-selected_typeofcrime = preprocess.multiselect("Select Type of Crime", data["typeofcrime"].unique())
+selected_typeofcrime = preprocess.multiselect("Select Type of Crime", preprocess.filter_options(data_version, data, "typeofcrime"))
+
+st.sidebar.markdown("### 🔎 Account Lookup")
+account_rows = preprocess.account_filter(data, data_version)
 
-# Filter data
-filtered_df = data[
-    (data["month"].isin(selected_month)) & 
-    (data["typeofaction"].isin(selected_action)) & 
-    (data["isfraud"].isin(selected_isfraud)) &
-    (data["typeofcrime"].isin(selected_typeofcrime))
-]
+# Filter data; with accounts selected only their rows are pulled from the index and filtered
+with tracing.span("filter"):
+    candidates = data if account_rows is None else data.take(account_rows)
+    filtered_df = preprocess.apply_filters(candidates, {
+        "month": selected_month,
+        "typeofaction": selected_action,
+        "isfraud": selected_isfraud,
+        "typeofcrime": selected_typeofcrime
+    })
 
 # Display filter summary
 st.sidebar.markdown("---")
@@ -282,12 +297,37 @@ st.sidebar.info(f"""
 **Percentage:** {(len(filtered_df)/len(data)*100):.1f}%
 """)
 
+# Rendering mode
+st.sidebar.markdown("---")
+st.sidebar.markdown("### ⚡ Rendering")
+lazy_mode = st.sidebar.toggle("Lazy chart rendering", value=False,
+                              help="Render each chart only when you switch it on. Heavy charts are drawn in the background.")
+
+# Performance panel, filled in at the end of the run
+st.sidebar.markdown("---")
+perf_panel = st.sidebar.expander("⏱️ Performance", expanded=False)
+with perf_panel:
+    st.toggle("Enable tracing", key="perf_tracing",
+              help="Time data loading, each filter and each chart's aggregate, render and st.pyplot step.")
+    st.checkbox("Track memory deltas", key="perf_memory",
+                help="Uses tracemalloc, which slows down every session on this server while it is on. The deltas are process-wide, so they include other sessions' allocations.")
+
 # ------------------------------------------------------------------- VISUALIZATIONS---------------------------------------------------------------
 
 st.markdown("---")
 st.markdown("## 📊 Analytics Dashboard")
 
-if not filtered_df.empty:
+if not filtered_df.empty and lazy_mode:
+    # Each section is computed on demand and reruns on its own; the heavy ones render in the background
+    lazy_section('daily', '📈 Daily Transactions', plot_daily_transactions, filtered_df)
+    lazy_section('fraud', '🚨 Fraud Analysis', plot_fraud_analysis, filtered_df)
+    lazy_section('distribution', '💰 Distribution of Transaction Amounts', plot_distribution_of_transaction_amounts, filtered_df,
+                 build=lambda df: build_figure('distribution_of_transaction_amounts', df), version=data_version)
+    lazy_section('fraud_type', '🧾 Types of Fraud Analysis', plot_fraud_type_analysis, filtered_df)
+    lazy_section('heatmap', '🔥 Heatmap of Total Amount by Crime Level Over Time', plot_heatmap, filtered_df,
+                 build=lambda df: build_figure('heatmap', df), version=data_version)
+    lazy_section('trends', '📉 Average Transaction Amount by Crime Level Over Time', plot_crime_level_trends, filtered_df)
+elif not filtered_df.empty:
     # Call the plotting functions from charts.py
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     plot_daily_transactions(filtered_df)
@@ -329,3 +369,5 @@ footer = """
 </div>
 """
 st.markdown(footer, unsafe_allow_html=True)
+
+tracing.render_panel(perf_panel, tracer)
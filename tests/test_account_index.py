@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alphapreprocess import AccountIndex, _search_accounts
+
+DATA = pd.read_csv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "newdataset.csv"))
+
+
+@pytest.fixture(scope="module")
+def source_index():
+    return AccountIndex(DATA["sourceid"].to_numpy())
+
+
+@pytest.fixture(scope="module")
+def destination_index():
+    return AccountIndex(DATA["destinationid"].to_numpy())
+
+
+@pytest.mark.parametrize("prefix", ["3", "30", "301", "9", "0", "007", "05", "185", "1234567", "abc", ""])
+def test_prefix_matches_brute_force(source_index, prefix):
+    expected = sorted(i for i in DATA["sourceid"].unique().tolist() if prefix.isdigit() and str(i).startswith(prefix))
+    assert sorted(source_index.prefix(prefix).tolist()) == expected
+
+
+def test_prefix_limit_returns_a_subset(source_index):
+    limited = source_index.prefix("3", limit=5).tolist()
+    assert len(limited) == 5
+    assert set(limited) <= set(source_index.prefix("3").tolist())
+
+
+@pytest.mark.parametrize("low, high", [(30000, 30500), (0, 100), (185, 185), (99_999, 200_000), (500, 400)])
+def test_range_matches_brute_force(source_index, low, high):
+    ids = DATA["sourceid"].unique()
+    expected = sorted(ids[(ids >= low) & (ids <= high)].tolist())
+    assert source_index.range(low, high).tolist() == expected
+
+
+@pytest.mark.parametrize("accounts", [[4161], [30105, 4161, 999_999], [999_999], []])
+def test_row_positions_match_mask(source_index, accounts):
+    expected = np.flatnonzero(DATA["sourceid"].isin(accounts))
+    assert sorted(source_index.row_positions(accounts).tolist()) == expected.tolist()
+
+
+def test_busiest_and_counts(source_index):
+    counts = DATA["sourceid"].value_counts()
+    busiest = source_index.busiest(5).tolist()
+    assert [counts[i] for i in busiest] == counts.iloc[:5].tolist()
+    assert source_index.count_of([4161, 999_999]).tolist() == [counts[4161], 0]
+
+
+def test_empty_search_ranks_by_combined_activity(source_index, destination_index):
+    totals = pd.concat([DATA["sourceid"], DATA["destinationid"]]).value_counts()
+    found = _search_accounts([source_index, destination_index], "", 5)
+    assert found == sorted(found)
+    # Ties at the cut-off may resolve either way; compare the counts, not the IDs
+    assert sorted((totals[i] for i in found), reverse=True) == totals.iloc[:5].tolist()
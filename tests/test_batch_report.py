@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_report import _metrics_row, key_metrics, run, slice_name
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "newdataset.csv")
+DATA = pd.read_csv(DATA_PATH)
+
+
+@pytest.fixture(scope="module")
+def metrics():
+    return key_metrics(DATA)
+
+
+def test_slice_name():
+    assert slice_name(5, "type1") == "month-05_type1"
+    assert slice_name(12.0, "type3") == "month-12_type3"
+
+
+def test_key_metrics_match_each_slice(metrics):
+    assert len(metrics) == DATA.groupby(["month", "typeofcrime"]).ngroups
+    for (month, crime), row in metrics.iterrows():
+        rows = DATA[(DATA["month"] == month) & (DATA["typeofcrime"] == crime)]
+        assert row["total_transactions"] == len(rows)
+        assert row["fraudulent_cases"] == rows["isfraud"].sum()
+        assert row["total_amount"] == pytest.approx(rows["amountofmoney"].sum())
+
+
+def test_metrics_row_keeps_counts_as_ints(metrics):
+    row = _metrics_row(metrics, metrics.index[0])
+    assert type(row["total_transactions"]) is int
+    assert type(row["fraudulent_cases"]) is int
+    assert type(row["avg_transaction"]) is float
+    assert type(row["fraud_percentage"]) is float
+
+
+def test_second_run_skips_every_slice(tmp_path, metrics):
+    first = run(DATA_PATH, str(tmp_path), workers=1, formats=["csv"])
+    assert first["slices_exported"] == len(metrics)
+    assert first["slices_failed"] == 0
+    assert first["charts_rendered"] == 0
+    assert sorted(os.listdir(tmp_path / slice_name(*metrics.index[0]))) == sorted(
+        ["metrics.csv", "daily_transactions.csv", "fraud_analysis.csv", "distribution_of_transaction_amounts.csv",
+         "fraud_type_analysis.csv", "heatmap.csv", "crime_level_trends.csv"])
+
+    second = run(DATA_PATH, str(tmp_path), workers=1, formats=["csv"])
+    assert second["slices_skipped"] == len(metrics)
+    assert second["slices_exported"] == 0
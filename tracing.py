@@ -0,0 +1,178 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# One JSON line per traced run. Nothing else configures this logger under `streamlit run`, so it gets its own
+# stderr handler at INFO; set a level or handlers on "blackmoney.perf" before import to route it elsewhere.
+logger = logging.getLogger("blackmoney.perf")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Tracer of the script run executing in this thread; None means tracing is off
+_current = contextvars.ContextVar("tracer", default=None)
+_NULL_SPAN = nullcontext()
+
+# Sessions currently asking for memory deltas. tracemalloc is process-wide, so it runs while this set is
+# non-empty and is stopped only once the last of them switches memory tracking off.
+_memory_sessions = set()
+_memory_lock = threading.Lock()
+_started_tracemalloc = False
+
+
+class Tracer:
+    """Collects timed spans (and optional memory deltas) for one script run."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        # Recorded on entry so parents are listed before their children
+        record = {"name": name, "depth": self._depth,
+                  "start_ms": (time.perf_counter() - self._origin) * 1000}
+        self.spans.append(record)
+        mem_before = tracemalloc.get_traced_memory()[0] if self.memory else None
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["duration_ms"] = (time.perf_counter() - start) * 1000
+            self._depth -= 1
+            if self.memory:
+                record["memory_delta_mb"] = (tracemalloc.get_traced_memory()[0] - mem_before) / 2**20
+
+    def total_ms(self):
+        return (time.perf_counter() - self._origin) * 1000
+
+    def to_dict(self):
+        return {"total_ms": self.total_ms(), "memory": self.memory, "spans": self.spans}
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def _track_memory(wanted):
+    """
+    Register whether this session wants memory deltas and start or stop tracemalloc to match.
+    tracemalloc counts allocations for the whole process, so the deltas include other sessions' work
+    done at the same time, and every session runs under it while at least one has memory tracking on.
+    Sessions whose browser tab has gone away are dropped here too, so closing a tab with memory tracking
+    on does not keep tracemalloc running for good.
+    """
+    global _started_tracemalloc
+    session = _session_id()
+    with _memory_lock:
+        if wanted:
+            _memory_sessions.add(session)
+        else:
+            _memory_sessions.discard(session)
+        if Runtime.exists():
+            runtime = Runtime.instance()
+            _memory_sessions.difference_update({s for s in _memory_sessions
+                                                if s is not None and s != session and not runtime.is_active_session(s)})
+
+        if _memory_sessions and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        elif not _memory_sessions and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+def start(enabled, memory=False):
+    """
+    Begin a new trace for the current script run and return its Tracer (None when disabled).
+    Memory deltas need tracemalloc, which only runs while at least one session asks for them.
+    """
+    _track_memory(enabled and memory)
+
+    tracer = Tracer(memory=memory) if enabled else None
+    _current.set(tracer)
+    return tracer
+
+
+def span(name):
+    """Time a block under the current tracer. A shared no-op context manager when tracing is off."""
+    tracer = _current.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name)
+
+
+def run_job(name, fn, *args):
+    """
+    Run fn(*args) as a background job under a span called name and return (result, trace).
+    Meant to be submitted through contextvars.copy_context().run, so the worker sees whether the submitting run
+    was traced. The job then gets a Tracer of its own, since its spans would otherwise interleave with the
+    page's, and its trace is logged as its own JSON line. trace is None when the submitting run was not traced.
+    """
+    parent = _current.get()
+    if parent is None:
+        return fn(*args), None
+
+    tracer = Tracer(memory=parent.memory and tracemalloc.is_tracing())
+    _current.set(tracer)
+    with tracer.span(name):
+        result = fn(*args)
+    trace = tracer.to_dict()
+    logger.info(json.dumps(trace))
+    return result, trace
+
+
+def record_job(name, trace):
+    """Keep the trace of the latest finished run of background job name for this session's performance panel."""
+    if trace is not None:
+        st.session_state.setdefault("_perf_jobs", {})[name] = trace
+
+
+def _spans_table(spans, memory):
+    spans = pd.DataFrame(spans)
+    spans["name"] = ["· " * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+    columns = ["name", "duration_ms"] + (["memory_delta_mb"] if memory else [])
+    return spans[columns].round(2)
+
+
+def render_panel(container, tracer):
+    """
+    Fill the sidebar performance panel with the spans of this run and log them as one JSON line.
+    Background jobs are listed below with the latest trace of each; the panel is only redrawn by page runs,
+    so a job that finishes during a section rerun shows up at the next one.
+    """
+    with container:
+        if tracer is None:
+            st.caption("Tracing is off. Switch it on to time the next run.")
+            return
+
+        trace = tracer.to_dict()
+        logger.info(json.dumps(trace))
+
+        st.metric("Run time", f"{trace['total_ms']:,.0f} ms")
+        st.dataframe(_spans_table(trace["spans"], tracer.memory), hide_index=True)
+
+        jobs = st.session_state.get("_perf_jobs", {})
+        if jobs:
+            st.caption("Background renders (latest of each)")
+            st.dataframe(_spans_table([s for job in jobs.values() for s in job["spans"]],
+                                      any(job["memory"] for job in jobs.values())), hide_index=True)
+        st.download_button("Export trace (JSON)", json.dumps(dict(trace, background=jobs), indent=2),
+                           file_name="dashboard_trace.json", mime="application/json")